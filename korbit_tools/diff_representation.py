@@ -1,11 +1,21 @@
+from __future__ import annotations
+
 import re
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-from github.File import File
+if TYPE_CHECKING:
+    from github.File import File
 
 from korbit_tools.models import LineNumberRange
 from korbit_tools.string_search import find_line_number_ranges_of_code_snippet_in_content
 
+# Matches the diff hunk header which provides context for the diff
+_HUNK_HEADER_RE = re.compile(r"@@ -\d+,\d+ \+\d+,\d+ @@ (.+)")
+# Matches and captures individual line numbers in the diff in groups 1 to 4,
+# or in groups 5 and 6 when only one line is involved
+_LINE_NUMBER_PATTERN_RE = re.compile(r"@@ -(\d+),(\d+) \+(\d+),(\d+) @@|@@ -(\d+),?\d* \+(\d+) @@")
+
 
 @dataclass(slots=True, frozen=True, eq=True)
 class DiffRepresentation:
@@ -19,14 +29,6 @@ class DiffRepresentation:
     diff: str
     file_path: str
     previous_file_path: str
-    # Matches the diff hunk header which provides context for the diff
-    regex_diff_hunk_header = r"@@ -\d+,\d+ \+\d+,\d+ @@ (.+)"
-    # Matches the entire diff line number group, including the @@ symbols
-    regex_diff_line_number_group = r"(@@ -\d+,?\d* \+\d+,?\d* @@)"
-    # Matches and captures individual line numbers in the diff
-    regex_diff_line_number_pattern = r"@@ -(\d+),(\d+) \+(\d+),(\d+) @@"
-    # Matches and captures individual line numbers in the diff when only one line is involved
-    regex_diff_one_line_number_pattern = r"@@ -(\d+),?\d* \+(\d+) @@"
 
     @classmethod
     def from_github_file(cls, github_file: File):
@@ -35,7 +37,7 @@ class DiffRepresentation:
 
     @staticmethod
     def _get_line_number_range_from_match_pair(start_line: int, num_edit_lines: int):
-        return LineNumberRange(start_number=start_line, end_number=start_line + num_edit_lines)
+        return LineNumberRange(start_line, start_line + num_edit_lines)
 
     def _get_line_numbers_edited_one_line(self, regex_results):
         edited_ranges = [
@@ -60,15 +62,28 @@ class DiffRepresentation:
 
         return edited_ranges
 
+    def _get_line_number_matches(self) -> list[re.Match]:
+        """Matches of the hunk line numbers, the one line form is only used when no hunk spans multiple lines."""
+        multiple_lines_matches = []
+        one_line_matches = []
+        for match in _LINE_NUMBER_PATTERN_RE.finditer(self.diff):
+            if match.group(1) is not None:
+                multiple_lines_matches.append(match)
+            else:
+                one_line_matches.append(match)
+        return multiple_lines_matches or one_line_matches
+
+    def _get_line_numbers_edited_from_matches(
+        self, line_number_matches: list[re.Match]
+    ) -> list[tuple[LineNumberRange, LineNumberRange]]:
+        if line_number_matches and line_number_matches[0].group(1) is not None:
+            return self._get_line_numbers_edited_multiple_lines([match.group(1, 2, 3, 4) for match in line_number_matches])
+        return self._get_line_numbers_edited_one_line([match.group(5, 6) for match in line_number_matches])
+
     def _get_line_numbers_edited_in_both_files(self) -> list[tuple[LineNumberRange, LineNumberRange]]:
         if not self.diff:
             return []
-        regex_results = re.findall(self.regex_diff_line_number_pattern, self.diff)
-
-        if not regex_results:
-            regex_results = re.findall(self.regex_diff_one_line_number_pattern, self.diff)
-            return self._get_line_numbers_edited_one_line(regex_results)
-        return self._get_line_numbers_edited_multiple_lines(regex_results)
+        return self._get_line_numbers_edited_from_matches(self._get_line_number_matches())
 
     def get_line_numbers_edited_in_old_file(self) -> list[LineNumberRange]:
         both_edited_line_numbers = self._get_line_numbers_edited_in_both_files()
@@ -106,18 +121,26 @@ class DiffRepresentation:
 
         if not self.diff:
             return []
-        newly_edited_lines = self.get_line_numbers_edited_in_new_file()
+        # Take the edited line numbers and the hunk header context from the same match so they stay aligned
+        line_number_matches = self._get_line_number_matches()
+        newly_edited_lines = [el[1] for el in self._get_line_numbers_edited_from_matches(line_number_matches)]
 
-        regex_results = re.findall(self.regex_diff_line_number_group, self.diff)
+        # Several hunks often share the same header, cache the search results to avoid re-scanning the file
+        hunk_header_line_ranges: dict[str, list[LineNumberRange]] = {}
         diff_line_ranges_with_increase_windows = []
-        for match, line_number_range in zip(regex_results, newly_edited_lines):
-            for diff_line in self.diff.split("\n"):
-                hunk_header_result = re.findall(self.regex_diff_hunk_header, diff_line)
-                if diff_line.startswith(match) and hunk_header_result:
-                    line_range_from_hunk_header = find_line_number_ranges_of_code_snippet_in_content(
-                        hunk_header_result[0], file_content
+        for match, line_number_range in zip(line_number_matches, newly_edited_lines):
+            hunk_header_result = None
+            # Only a match starting a line is a hunk header, not header-like text within an edited line
+            if match.start() == 0 or self.diff[match.start() - 1] == "\n":
+                hunk_header_result = _HUNK_HEADER_RE.match(self.diff, match.start())
+            if hunk_header_result:
+                hunk_header = hunk_header_result.group(1)
+                if hunk_header not in hunk_header_line_ranges:
+                    hunk_header_line_ranges[hunk_header] = find_line_number_ranges_of_code_snippet_in_content(
+                        hunk_header, file_content
                     )
-                    if line_range_from_hunk_header:
-                        line_number_range.start_number = line_range_from_hunk_header[0].start_number
+                line_range_from_hunk_header = hunk_header_line_ranges[hunk_header]
+                if line_range_from_hunk_header:
+                    line_number_range.start_number = line_range_from_hunk_header[0].start_number
             diff_line_ranges_with_increase_windows.append(line_number_range)
         return diff_line_ranges_with_increase_windows
@@ -1,10 +1,13 @@
-import fnmatch
 import logging
 import os
+import shutil
+import tempfile
 import uuid
 import zipfile
-from io import BytesIO
-from typing import Iterator, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import BinaryIO, Iterator, Optional
 
 import github
 import requests
@@ -14,12 +17,24 @@ from github.Repository import Repository
 from korbit_tools.diff_representation import DiffRepresentation
 from korbit_tools.local_file import LocalFile, from_content_file
 from korbit_tools.llm_utils import count_token_string
+from korbit_tools.string_search import should_ignore_file
 
 logger = logging.getLogger(__name__)
 
 # We limit the number of token per file to be < 50k tokens otherwise we can't do the review
 CONTENT_FILE_TOKEN_LIMIT = 50000
 
+# Number of GitHub API requests sent concurrently, kept low to stay clear of the secondary rate limit
+MAX_CONCURRENT_GITHUB_REQUESTS = 8
+
+# Repository archives larger than this are spooled to disk instead of memory while downloading
+ARCHIVE_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+DEFAULT_KORBITIGNORE_PATH = ".korbitignore"
+
+# Parsed ignore rules by path, along with the modification time of the file they were read from
+_ignore_file_rules_cache: dict[str, tuple[float, list[str]]] = {}
+
 
 class GithubUtils:
 
@@ -60,24 +75,46 @@ class GithubUtils:
         Args:
             repository: repository containing the pull request.
             pull_request: The pull request for which the content are being retrieved.
-            allowed_extensions: A list of extensions that will be accepted.
+            allowed_extensions: A list of extensions that will be accepted, all files are accepted when None.
 
         Yields:
             Iterator[tuple[LocalFile, DiffRepresentation]]: A tuple containing
             the content file and its corresponding pull request file.
 
         """
-        pr_files = GithubUtils.get_pull_request_files(pull_request)
-        for pr_file in pr_files:
-            if not any(pr_file.file_path.endswith(extension) for extension in allowed_extensions):
-                continue
-            content_file = GithubUtils.get_pull_request_content_files(
-                repository, pull_request, pr_file
-            )
-            if content_file:
-                yield content_file, pr_file
-            else:
-                logger.debug("Skipping file: " + pr_file.file_path)
+        pr_files = [
+            pr_file
+            for pr_file in GithubUtils.get_pull_request_files(pull_request)
+            if allowed_extensions is None
+            or any(pr_file.file_path.endswith(extension) for extension in allowed_extensions)
+        ]
+        # Each content file is a separate GitHub API request, fetch them concurrently while keeping
+        # at most MAX_CONCURRENT_GITHUB_REQUESTS in flight, both for the secondary rate limit and so
+        # a caller that stops early doesn't spend API quota on files it will never read.
+        pr_files_iter = iter(pr_files)
+        pending_fetches: deque[tuple[Future, DiffRepresentation]] = deque()
+        executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_GITHUB_REQUESTS)
+
+        def submit_fetch(pr_file: DiffRepresentation):
+            future = executor.submit(GithubUtils.get_pull_request_content_files, repository, pull_request, pr_file)
+            pending_fetches.append((future, pr_file))
+
+        try:
+            for pr_file in islice(pr_files_iter, MAX_CONCURRENT_GITHUB_REQUESTS):
+                submit_fetch(pr_file)
+            while pending_fetches:
+                future, pr_file = pending_fetches.popleft()
+                content_file = future.result()
+                next_pr_file = next(pr_files_iter, None)
+                if next_pr_file is not None:
+                    submit_fetch(next_pr_file)
+                if content_file:
+                    yield content_file, pr_file
+                else:
+                    logger.debug("Skipping file: " + pr_file.file_path)
+        finally:
+            # Don't wait on fetches whose results won't be consumed when the caller stops early
+            executor.shutdown(wait=False, cancel_futures=True)
 
     @staticmethod
     def get_repository_content_from_path(
@@ -119,30 +156,30 @@ class GithubUtils:
         return local_files
 
     @staticmethod
-    def get_ignore_file_rules() -> list[str]:
-        default_korbitignore_path = ".korbitignore"
-        with open(default_korbitignore_path, "r") as file:
-            default_korbitignore_lines = file.readlines()
-        korbit_ignore_lines = default_korbitignore_lines
-        return [line.strip() for line in korbit_ignore_lines]
+    def get_ignore_file_rules(korbitignore_path: str = DEFAULT_KORBITIGNORE_PATH) -> list[str]:
+        """Read the ignore rules, the file is only read again when its modification time changes."""
+        modification_time = os.path.getmtime(korbitignore_path)
+        cached_rules = _ignore_file_rules_cache.get(korbitignore_path)
+        if cached_rules is None or cached_rules[0] != modification_time:
+            with open(korbitignore_path, "r") as file:
+                korbit_ignore_lines = file.readlines()
+            cached_rules = (modification_time, [line.strip() for line in korbit_ignore_lines])
+            _ignore_file_rules_cache[korbitignore_path] = cached_rules
+        return list(cached_rules[1])
 
     @staticmethod
-    def should_ignore_file(file_path: str, rules: list[str]):
-        for rule in rules:
-            rule_with_wildcard = f"{rule}*" if rule.endswith("/") else rule
-            if fnmatch.fnmatch(file_path, rule_with_wildcard):
-                return True
-        return False
+    def should_ignore_file(file_path: str, rules: list[str]) -> bool:
+        return should_ignore_file(file_path, rules)
 
 
 def extract_zip_content_to_folder(
-    content: bytes, base_path: str, parent_dir=None
+    zip_content: BinaryIO, base_path: str, parent_dir=None
 ) -> tuple[str, str]:
     """
     Extracts the content of a zip file to a specified folder.
 
     Args:
-        content (bytes): The content of the zip file.
+        zip_content (BinaryIO): A seekable file object containing the zip file.
         base_path (str): The base path where the content will be extracted.
         parent_dir (str, optional): The parent directory within the zip file to be extracted. Defaults to None.
 
@@ -150,22 +187,24 @@ def extract_zip_content_to_folder(
         tuple[str, str]: A tuple containing the write path and the full path of the extracted content.
     """
     try:
-        zip_file = zipfile.ZipFile(BytesIO(content))
+        zip_file = zipfile.ZipFile(zip_content)
     except zipfile.BadZipFile:
         print(
             f"Received bytes that are not a valid zip file, might be an empty repo being scanned."
-            f" Length of bytes received: {len(content)}"
+            f" Length of bytes received: {zip_content.seek(0, os.SEEK_END)}"
         )
+        raise
     temp_dir_name = str(uuid.uuid4())
     write_path = os.path.join(base_path, temp_dir_name)
-    if parent_dir:
-        repo_dir_path = parent_dir
-        _write_path = os.path.join(write_path, parent_dir)
-        zip_file.extractall(_write_path)
-    else:
-        zip_info = zip_file.infolist()[0]
-        repo_dir_path = zip_info.filename
-        zip_file.extractall(write_path)
+    with zip_file:
+        if parent_dir:
+            repo_dir_path = parent_dir
+            _write_path = os.path.join(write_path, parent_dir)
+            zip_file.extractall(_write_path)
+        else:
+            zip_info = zip_file.infolist()[0]
+            repo_dir_path = zip_info.filename
+            zip_file.extractall(write_path)
     full_path = os.path.join(write_path, repo_dir_path)
     return write_path, full_path
 
@@ -183,6 +222,13 @@ def download_repository(repository: Repository, ref: str, folder_path=".") -> st
         A the local path to the downloaded repository.
     """
     archive_link = repository.get_archive_link("zipball", ref)
-    response = requests.get(archive_link, stream=True)
-    _, full_path = extract_zip_content_to_folder(response.content, folder_path)
+    # Stream the archive into a spooled file, zipfile needs a seekable file but this
+    # avoids holding a second in-memory copy of the archive and spills large ones to disk.
+    with requests.get(archive_link, stream=True) as response, tempfile.SpooledTemporaryFile(
+        max_size=ARCHIVE_SPOOL_MAX_SIZE
+    ) as archive:
+        response.raw.decode_content = True
+        shutil.copyfileobj(response.raw, archive)
+        archive.seek(0)
+        _, full_path = extract_zip_content_to_folder(archive, folder_path)
     return full_path
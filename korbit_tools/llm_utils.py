@@ -1,9 +1,21 @@
-import tiktoken
+from __future__ import annotations
+
+import functools
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tiktoken
 
 MODEL_NAME = "gpt-4"
 BASE_TOKEN_PER_MESSAGE = 3
 
-encoder = tiktoken.encoding_for_model(MODEL_NAME)
+
+@functools.lru_cache(maxsize=1)
+def _get_encoder() -> tiktoken.Encoding:
+    # Loading the encoding reads the BPE ranks file, only do it once tokens are actually needed
+    import tiktoken
+
+    return tiktoken.encoding_for_model(MODEL_NAME)
 
 
 def estimate_token_count(messages: list[dict[str, str]]):
@@ -16,16 +28,24 @@ def estimate_token_count(messages: list[dict[str, str]]):
 
 
 def count_token_string(content: str) -> int:
-    return len(encoder.encode(content))
+    return len(_get_encoder().encode(content))
 
 
 def truncate_string(content: str, threshold: int) -> str:
     """
-    Truncate string until the threshold tokens is met, each iteration 
-    remove 1000 characters from the string
+    Truncate string to the first threshold tokens, the content is encoded once
+    and the kept tokens are decoded back to a string
     """
-    token_count = count_token_string(content)
-    while token_count > threshold:
-        content = content[:-1000]
-        token_count = count_token_string(content)
-    return content
+    encoder = _get_encoder()
+    tokens = encoder.encode(content)
+    if len(tokens) <= threshold:
+        return content
+    tokens = tokens[:threshold]
+    # A cut in the middle of a multi-byte character would decode to a replacement character,
+    # ignore the partial bytes so the result stays a prefix of the content
+    truncated_content = encoder.decode(tokens, errors="ignore")
+    # Re-encoding the prefix can produce a different tokenization, keep it within the threshold
+    while tokens and count_token_string(truncated_content) > threshold:
+        tokens = tokens[:-1]
+        truncated_content = encoder.decode(tokens, errors="ignore")
+    return truncated_content
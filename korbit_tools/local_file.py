@@ -1,15 +1,21 @@
+from __future__ import annotations
+
 import logging
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
 
-from github.ContentFile import ContentFile
+if TYPE_CHECKING:
+    from github.ContentFile import ContentFile
 
 from korbit_tools import language_extensions
 from korbit_tools.models import LineNumberRange
+from korbit_tools.string_search import get_line_start_offsets
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PROCESS_EXTENSIONS = frozenset({".py", ".js", ".jsx", ".ts", ".tsx"})
+
 
 @dataclass
 class LocalFile:
@@ -18,6 +24,10 @@ class LocalFile:
     path: str
     html_url: str
     full_local_path: str = ""
+    # contents the caches below were computed from, they are reset when contents is reassigned
+    _cached_contents: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _line_start_offsets: Optional[list[int]] = field(default=None, init=False, repr=False, compare=False)
+    _number_of_lines: Optional[int] = field(default=None, init=False, repr=False, compare=False)
 
     def get_truncated_contents(self, max_char_limit):
         return self.contents[:max_char_limit]
@@ -34,25 +44,52 @@ class LocalFile:
 
         return language
 
+    def _reset_caches_if_contents_changed(self):
+        if self._cached_contents is not self.contents:
+            self._cached_contents = self.contents
+            self._line_start_offsets = None
+            self._number_of_lines = None
+
+    def get_content_between_line_numbers(self, line_number_range: LineNumberRange) -> str:
+        self._reset_caches_if_contents_changed()
+        if self._line_start_offsets is None:
+            self._line_start_offsets = get_line_start_offsets(self.contents)
+        return get_content_between_line_numbers(line_number_range, self.contents, self._line_start_offsets)
+
     def get_number_of_lines(self) -> int:
-        return get_number_of_lines(self.contents)
+        self._reset_caches_if_contents_changed()
+        if self._number_of_lines is None:
+            self._number_of_lines = get_number_of_lines(self.contents)
+        return self._number_of_lines
 
-    def should_process_file(self, file_extensions=[".py", ".js", ".jsx", ".ts", ".tsx"]) -> bool:
-        return any(self.filename.lower().endswith(extension) for extension in file_extensions)
+    def should_process_file(self, file_extensions: frozenset[str] = DEFAULT_PROCESS_EXTENSIONS) -> bool:
+        extension = os.path.splitext(self.filename)[1]
+        return extension.lower() in file_extensions
 
     def allow_llm_run(self):
         """Check if the function should process the file and if the contents are not empty."""
         return self.should_process_file() and len(self.contents.strip()) > 0
 
 
-def get_content_between_line_numbers(line_number_range: LineNumberRange, content: str) -> str:
-    lines = content.split("\n")
-    start_idx = line_number_range.start_number - 1
-    return "\n".join(lines[start_idx : line_number_range.end_number])
+def get_content_between_line_numbers(
+    line_number_range: LineNumberRange, content: str, line_start_offsets: Optional[list[int]] = None
+) -> str:
+    """
+    Slice the lines of the range out of the content using the offsets at which each line starts,
+    pass precomputed offsets when extracting several ranges from the same content.
+    """
+    if line_start_offsets is None:
+        line_start_offsets = get_line_start_offsets(content)
+    start_idx = max(line_number_range.start_number - 1, 0)
+    end_idx = min(line_number_range.end_number, len(line_start_offsets))
+    if start_idx >= end_idx:
+        return ""
+    end_offset = line_start_offsets[end_idx] - 1 if end_idx < len(line_start_offsets) else len(content)
+    return content[line_start_offsets[start_idx] : end_offset]
 
 
 def get_number_of_lines(content: str) -> int:
-    return len(content.split("\n"))
+    return content.count("\n") + 1
 
 
 def from_content_file(content_file: ContentFile) -> LocalFile:
@@ -66,12 +103,7 @@ def from_content_file(content_file: ContentFile) -> LocalFile:
 
 def from_content_file_safely(content_file: ContentFile) -> Optional[LocalFile]:
     try:
-        return LocalFile(
-            contents=content_file.decoded_content.decode(),
-            filename=content_file.name,
-            path=content_file.path,
-            html_url=content_file.html_url,
-        )
+        return from_content_file(content_file)
     except UnicodeDecodeError:
         logger.warn(f"Couldn't decode file {content_file.path}")
     except AssertionError:
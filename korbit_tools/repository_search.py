@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import os
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from logging import getLogger
 from typing import Iterator
 
@@ -10,6 +12,10 @@ from korbit_tools.local_file import LocalFile
 from korbit_tools.string_search import should_ignore_file
 
 KORBIT_IGNORE_NAME = ".korbitignore"
+READ_FILE_BATCH_SIZE = 64
+READ_FILE_MAX_WORKERS = 8
+# Version control, dependency and build folders that are never worth walking into
+IGNORED_FOLDER_NAMES = frozenset({".git", "node_modules", "venv", ".venv", "__pycache__", "dist", "build"})
 
 
 class LocalRepository:
@@ -55,22 +61,42 @@ class LocalRepository:
         """
         full_path = os.path.join(self.repo_path, path)
         if os.path.isfile(full_path):
-            list_files = [(self.repo_path, [], [path])]
+            file_paths = iter([] if should_ignore_file(full_path, self.ignore_rules) else [full_path])
         else:
-            list_files = os.walk(full_path)
+            file_paths = self._iter_file_paths(full_path)
 
-        for root, _, files in list_files:
-            for file_name in files:
-                full_file_path = os.path.join(root, file_name)
-                if not should_ignore_file(full_file_path, self.ignore_rules):
-                    local_file = self.read_file(full_file_path)
+        # Reading files is I/O bound, read them in batches on a thread pool to overlap the syscalls
+        with ThreadPoolExecutor(max_workers=READ_FILE_MAX_WORKERS) as executor:
+            while batch := list(islice(file_paths, READ_FILE_BATCH_SIZE)):
+                for local_file in executor.map(self.read_file, batch):
                     if local_file:
                         yield local_file
 
+    def _iter_file_paths(self, folder_path: str) -> Iterator[str]:
+        """
+        Recursively yields the paths of the files in the folder that are not ignored.
+        Uses os.scandir to get the entry types without an extra stat call and
+        doesn't descend into ignored directories.
+        """
+        try:
+            entries = list(os.scandir(folder_path))
+        except OSError as e:
+            self.logger.debug(f"Couldn't list folder {folder_path}: {str(e)}")
+            return
+
+        for entry in entries:
+            if entry.is_dir():
+                # Like os.walk, don't follow symbolic links to directories
+                if not entry.is_symlink() and not should_ignore_file(os.path.join(entry.path, ""), self.ignore_rules):
+                    yield from self._iter_file_paths(entry.path)
+            elif not should_ignore_file(entry.path, self.ignore_rules):
+                yield entry.path
+
     def count_languages_extensions(self) -> Counter[str]:
         """Return the extension of all the files in a repo folder"""
         extensions: Counter[str] = Counter()
-        for _, _, files in os.walk(self.repo_path):
+        for root, dirs, files in os.walk(self.repo_path):
+            self._prune_ignored_folders(root, dirs)
             for file in files:
                 extension = os.path.splitext(file)[1]
                 if extension:
@@ -89,6 +115,7 @@ class LocalRepository:
         """
         tree = {}
         for root, dirs, files in os.walk(self.repo_path):
+            self._prune_ignored_folders(root, dirs)
             level = root.count(os.sep) - self.repo_path.count(os.sep)
             if level <= depth:
                 name = root.replace(self.repo_path, "/")
@@ -97,6 +124,15 @@ class LocalRepository:
                 tree[name] = dirs + files
         return tree
 
+    def _prune_ignored_folders(self, root: str, dirs: list[str]):
+        """Remove in place the ignored folders from the os.walk dirs list so they are not walked into."""
+        dirs[:] = [
+            folder
+            for folder in dirs
+            if folder not in IGNORED_FOLDER_NAMES
+            and not should_ignore_file(os.path.join(root, folder, ""), self.ignore_rules)
+        ]
+
     def get_full_file_path(self, path: str) -> str:
         if os.path.isabs(path):
             return path
@@ -1,28 +1,46 @@
+import bisect
 import fnmatch
+import functools
 import logging
 import re
 import json
-from typing import Optional
-
-from fuzzywuzzy import fuzz
+from typing import Callable, Optional
 
 from korbit_tools.models import LineNumberRange
 
 logger = logging.getLogger(__name__)
 
+FUZZY_MATCH_THRESHOLD = 90
+# Matches an ellipsis, optionally wrapped in brackets or braces, at the end of a line
+_TRAILING_ELLIPSIS_RE = re.compile(r"(\[|\{)?\.\.\.(\]|\})?$")
+# Matches the content of a ```json code block
+_JSON_BLOCK_RE = re.compile(r"```json.*?\n(.+?)```", re.IGNORECASE | re.DOTALL)
+
 
 def split_and_process_snippet(code_snippet: str) -> list[str]:
     code_snippet_lines = code_snippet.strip().splitlines()
-    code_snippet_lines[0] = re.sub(r"(\[|\{)?\.\.\.(\]|\})?$", "", code_snippet_lines[0])
-    code_snippet_lines[-1] = re.sub(r"(\[|\{)?\.\.\.(\]|\})?$", "", code_snippet_lines[-1])
-    code_snippet_lines = list(map(lambda line: line.strip(), code_snippet_lines))
+    code_snippet_lines[0] = _TRAILING_ELLIPSIS_RE.sub("", code_snippet_lines[0])
+    code_snippet_lines[-1] = _TRAILING_ELLIPSIS_RE.sub("", code_snippet_lines[-1])
+
+    return [line.strip() for line in code_snippet_lines]
 
-    return code_snippet_lines
+
+def is_fuzzy_match(line: str, content_line: str, ratio: Callable[..., float]) -> bool:
+    content_line = content_line.strip()
+    # fuzz.ratio can't exceed 2 * min_len / (len_a + len_b), skip the scorer for lines that are too short or too long
+    total_length = len(line) + len(content_line)
+    if total_length == 0 or 200 * min(len(line), len(content_line)) <= FUZZY_MATCH_THRESHOLD * total_length:
+        return False
+    return ratio(line, content_line, score_cutoff=FUZZY_MATCH_THRESHOLD) > FUZZY_MATCH_THRESHOLD
 
 
 def get_line_idx_in_content(end_line: str, content_lines: list[str], fuzzy_match=False) -> int:
+    if fuzzy_match:
+        # Only needed when the exact search fails, don't load it on import
+        from rapidfuzz import fuzz
+
     for idx, content_line in enumerate(content_lines):
-        if fuzzy_match and fuzz.ratio(end_line, content_line.strip()) > 90 or end_line in content_line:
+        if fuzzy_match and is_fuzzy_match(end_line, content_line, fuzz.ratio) or end_line in content_line:
             return idx
     return -1
 
@@ -37,33 +55,79 @@ def get_line_number_range(
     return LineNumberRange(start_line_idx + 1, end_line_idx + 1)
 
 
-def get_line_number_ranges_in_content(
+def get_line_start_offsets(content: str) -> list[int]:
+    """Return the character offset at which each line of the content starts."""
+    line_start_offsets = [0]
+    newline_idx = content.find("\n")
+    while newline_idx != -1:
+        line_start_offsets.append(newline_idx + 1)
+        newline_idx = content.find("\n", newline_idx + 1)
+    return line_start_offsets
+
+
+def get_exact_line_number_ranges_in_content(
     start_line_contents: str, end_line_contents: str, content: str
 ) -> list[LineNumberRange]:
-    content_lines = content.split("\n")
+    """
+    Exact counterpart of the fuzzy scan, searching the whole content with str.find
+    and mapping the match offsets back to line indexes instead of testing every line.
+    """
+    line_start_offsets = get_line_start_offsets(content)
     line_number_ranges = []
 
-    def scan_content(fuzzy_match):
-        idx = 0
+    def find_line_idx(line_contents: str, from_line_idx: int) -> int:
+        match_offset = content.find(line_contents, line_start_offsets[from_line_idx])
+        if match_offset == -1:
+            return -1
+        return bisect.bisect_right(line_start_offsets, match_offset) - 1
+
+    idx = 0
+    while idx < len(line_start_offsets):
+        start_line_idx = find_line_idx(start_line_contents, idx)
+        if start_line_idx == -1:
+            break
+        end_line_idx = find_line_idx(end_line_contents, start_line_idx)
+        if end_line_idx == -1:
+            # The end line won't be found after any later start line either
+            logger.debug(f"Couldn't find end line: {end_line_contents} for start_line: {start_line_contents} in content.")
+            break
+        line_number_ranges.append(LineNumberRange(start_line_idx + 1, end_line_idx + 1))
+        idx = end_line_idx + 1
+    return line_number_ranges
+
+
+def get_line_number_ranges_in_content(
+    start_line_contents: str, end_line_contents: str, content: str
+) -> list[LineNumberRange]:
+    line_number_ranges = get_exact_line_number_ranges_in_content(start_line_contents, end_line_contents, content)
+
+    if len(line_number_ranges) == 0 and start_line_contents:
+        # Only needed when the exact search fails, don't load it on import
+        from rapidfuzz import fuzz, process
+
+        content_lines = content.split("\n")
+        # Score every line in a single call, rapidfuzz stops scoring a line as soon as it can't reach the cutoff
+        start_line_idxs = [
+            idx
+            for _, score, idx in process.extract_iter(
+                start_line_contents,
+                content_lines,
+                scorer=fuzz.ratio,
+                processor=str.strip,
+                score_cutoff=FUZZY_MATCH_THRESHOLD,
+            )
+            if score > FUZZY_MATCH_THRESHOLD
+        ]
+        next_idx = 0
         # if the code snippet is a single line function call or class definition in single line,
         # when in the code base it's multiple lines, it will fail.
-        while idx < len(content_lines):
-            line_number_range = None
-            if fuzzy_match:
-                if fuzz.ratio(start_line_contents, content_lines[idx].strip()) > 90:
-                    line_number_range = get_line_number_range(idx, content_lines, end_line_contents, True)
-            else:
-                if start_line_contents in content_lines[idx]:
-                    line_number_range = get_line_number_range(idx, content_lines, end_line_contents)
+        for idx in start_line_idxs:
+            if idx < next_idx:
+                continue
+            line_number_range = get_line_number_range(idx, content_lines, end_line_contents, True)
             if line_number_range is not None:
                 line_number_ranges.append(line_number_range)
-                idx = line_number_range.end_number - 1
-            idx += 1
-
-    scan_content(fuzzy_match=False)
-
-    if len(line_number_ranges) == 0:
-        scan_content(fuzzy_match=True)
+                next_idx = line_number_range.end_number
         if len(line_number_ranges) > 0:
             logger.info(
                 f"Used fuzz.ratio() at 90% to find:{start_line_contents} and end_line:{end_line_contents} in content."
@@ -80,12 +144,18 @@ def find_line_number_ranges_of_code_snippet_in_content(code_snippet: str, conten
     return line_number_ranges
 
 
-def should_ignore_file(file_path: str, rules: list[str]):
-    for rule in rules:
-        rule_with_wildcard = f"{rule}*" if rule.endswith("/") else rule
-        if fnmatch.fnmatch(file_path, rule_with_wildcard):
-            return True
-    return False
+@functools.lru_cache(maxsize=8)
+def compile_ignore_rules(rules: tuple[str, ...]) -> Optional[re.Pattern]:
+    """Compile the ignore rules into a single regex so a path is tested once instead of once per rule."""
+    if not rules:
+        return None
+    rules_with_wildcard = (f"{rule}*" if rule.endswith("/") else rule for rule in rules)
+    return re.compile("|".join(fnmatch.translate(rule) for rule in rules_with_wildcard))
+
+
+def should_ignore_file(file_path: str, rules: list[str]) -> bool:
+    ignore_pattern = compile_ignore_rules(tuple(rules))
+    return ignore_pattern is not None and ignore_pattern.match(file_path) is not None
 
 def extract_json_from_text(output: str) -> str:
     """
@@ -96,7 +166,7 @@ def extract_json_from_text(output: str) -> str:
     > ```
     This functions extract from text the JSON content of the code block.
     """
-    match = re.search(r"```json*\n(.+?)```", output, re.MULTILINE | re.IGNORECASE | re.DOTALL)
+    match = _JSON_BLOCK_RE.search(output)
     code_block_content = output
     if match:
         code_block_content = match.group(1)
@@ -0,0 +1,28 @@
+from korbit_tools.diff_representation import DiffRepresentation
+
+FILE_CONTENT = "\n".join(
+    ["def foo():", "    a = 1", "    x = '@@ -10,2 +10,3 @@'", "    return a", ""]
+    + [f"# line {idx}" for idx in range(6, 21)]
+    + ["def bar():", "    b = 1", "    c = 2", "    d = 3", "    return b + c + d", ""]
+)
+
+DIFF = """@@ -1,4 +1,4 @@ def foo():
+ def foo():
+-    a = 0
++    a = 1
++    x = '@@ -10,2 +10,3 @@'
+@@ -22,4 +22,5 @@ def bar():
+     b = 1
++    c = 2
+     d = 3
+     return b + c + d"""
+
+
+def test_extended_diff_line_ranges_ignore_hunk_header_text_in_edited_lines():
+    diff_representation = DiffRepresentation(DIFF, "file.py", "file.py")
+    newly_edited_lines = diff_representation.get_line_numbers_edited_in_new_file()
+
+    line_ranges = diff_representation.get_extended_diff_line_ranges_by_hunk_header(FILE_CONTENT)
+
+    assert len(line_ranges) == len(newly_edited_lines)
+    assert [(r.start_number, r.end_number) for r in line_ranges] == [(1, 5), (10, 13), (21, 27)]
@@ -0,0 +1,29 @@
+import pytest
+import tiktoken
+
+from korbit_tools import llm_utils
+
+# Byte-level encoding, every UTF-8 byte is a token so multi-byte characters span several tokens
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes", pat_str=r"[\s\S]", mergeable_ranks={bytes([byte]): byte for byte in range(256)}, special_tokens={}
+)
+
+
+@pytest.fixture(autouse=True)
+def byte_encoder(monkeypatch):
+    monkeypatch.setattr(llm_utils, "_get_encoder", lambda: BYTE_ENCODING)
+
+
+@pytest.mark.parametrize("threshold", range(0, 15))
+def test_truncate_string_does_not_split_multi_byte_characters(threshold):
+    content = "你好世界" * 10
+
+    truncated_content = llm_utils.truncate_string(content, threshold)
+
+    assert content.startswith(truncated_content)
+    assert "�" not in truncated_content
+    assert llm_utils.count_token_string(truncated_content) <= threshold
+
+
+def test_truncate_string_keeps_content_within_threshold():
+    assert llm_utils.truncate_string("hello", 10) == "hello"
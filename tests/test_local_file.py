@@ -0,0 +1,20 @@
+from korbit_tools.local_file import LocalFile
+from korbit_tools.models import LineNumberRange
+
+
+def test_get_content_between_line_numbers_after_contents_change():
+    local_file = LocalFile(contents="a\nb\nc", filename="file.py", path="file.py", html_url="")
+    assert local_file.get_content_between_line_numbers(LineNumberRange(2, 3)) == "b\nc"
+
+    local_file.contents = "first line\nsecond line\nthird line"
+
+    assert local_file.get_content_between_line_numbers(LineNumberRange(2, 3)) == "second line\nthird line"
+
+
+def test_get_number_of_lines_after_contents_change():
+    local_file = LocalFile(contents="a\nb", filename="file.py", path="file.py", html_url="")
+    assert local_file.get_number_of_lines() == 2
+
+    local_file.contents = "a\nb\nc\nd"
+
+    assert local_file.get_number_of_lines() == 4